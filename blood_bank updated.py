@@ -1,59 +1,321 @@
 # blood_bank.py
-from typing import Dict, Any
+from typing import Dict, Any, Deque, DefaultDict, Iterable, Iterator, List, Mapping, Optional, Tuple
+from types import MappingProxyType
+from collections import Counter, deque, defaultdict
+import atexit
+import copy
 import json
 import os
-from datetime import datetime
-
-DATA_FILE = "data.json"
+import queue
+import shutil
+import threading
+import time
+from datetime import date
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
+DATA_FILE = "data.json"  # legacy single-document store, migrated on first run
+INVENTORY_FILE = "inventory.json"
+DONORS_FILE = "donors.jsonl"
+PATIENTS_FILE = "patients.jsonl"
+LOGS_FILE = "logs.jsonl"
+RECORD_TABLES = ("donors", "patients", "logs")
+INDEXED_TABLES = ("donors", "patients")
 CRITICAL_THRESHOLD = 500 # ml
+SORTED_TYPES: Tuple[str, ...] = ("A+", "A-", "AB+", "AB-", "B+", "B-", "O+", "O-")
+LOG_BATCH_SIZE = 64
+LOG_FLUSH_INTERVAL = 0.25  # seconds
+
+# Donor types each recipient type can receive, the recipient's own type last.
+RECEIVABLE: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "O-": ("O-",),
+    "O+": ("O-", "O+"),
+    "A-": ("O-", "A-"),
+    "A+": ("O-", "O+", "A-", "A+"),
+    "B-": ("O-", "B-"),
+    "B+": ("O-", "O+", "B-", "B+"),
+    "AB-": ("O-", "A-", "B-", "AB-"),
+    "AB+": ("O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"),
+})
+
+
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _dumps_line(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _atomic_write(path: str, payload: bytes):
+    # Write to a sibling temp file and rename it over the target so a crash
+    # never leaves a truncated file behind; the previous version is kept
+    # as <path>.bak.
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    if os.path.exists(path):
+        shutil.copyfile(path, path + ".bak")
+    os.replace(tmp, path)
 
 
 class Database:
-    def __init__(self, path: str = DATA_FILE):
+    _DEFAULTS: Dict[str, Any] = {
+        "inventory": dict.fromkeys(("A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"), 2000),
+        "schema_version": 1,
+    }
+
+    def __init__(self, path: str = INVENTORY_FILE, donors_path: str = DONORS_FILE,
+                 patients_path: str = PATIENTS_FILE, logs_path: str = LOGS_FILE):
         self.path = path
+        self.donors_path = donors_path
+        self.patients_path = patients_path
+        self.logs_path = logs_path
         self.data: Dict[str, Any] = {}
+        # Donor/patient/log history is only read from its JSONL file the
+        # first time it is needed (see table()); startup loads the inventory.
+        self._tables: Dict[str, List[Any]] = {}
+        # Mutations only mark the inventory snapshot dirty and queue new
+        # records; flush() writes them once per menu action. Records are
+        # appended to their JSONL file, only the inventory is rewritten.
+        self._dirty = False
+        self._autoflush = False
+        self._pending: Dict[str, Deque[Any]] = {t: deque() for t in INDEXED_TABLES}
+        # Per-table lookup indices for search_records, kept in sync by add_record.
+        self.by_id: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+        self.by_bt: Dict[str, DefaultDict[str, List[Dict[str, Any]]]] = {}
+        # Lowercased names, parallel to table(name), so name searches
+        # don't call .lower() on every record per query.
+        self.names_lc: Dict[str, List[str]] = {}
+        # Running report aggregates, so generate_reports never rescans history.
+        self._stats: Optional[Dict[str, Any]] = None
         self.load()
+        # Log entries are handed to a background writer so the menu never
+        # waits on logs.jsonl; it appends them in batches.
+        self._log_q: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        threading.Thread(target=self._log_worker, daemon=True).start()
+        atexit.register(self._flush_logs)
+
+    def _table_path(self, table: str) -> str:
+        return {
+            "donors": self.donors_path,
+            "patients": self.patients_path,
+            "logs": self.logs_path,
+        }[table]
 
     def ensure_structure(self):
-        changed = False
-        if "inventory" not in self.data:
-            self.data["inventory"] = {
-                "A+": 2000, "A-": 2000, "B+": 2000, "B-": 2000,
-                "AB+": 2000, "AB-": 2000, "O+": 2000, "O-": 2000
-            }
-            changed = True
-        if "donors" not in self.data:
-            self.data["donors"] = []
-            changed = True
-        if "patients" not in self.data:
-            self.data["patients"] = []
-            changed = True
-        if "logs" not in self.data:
-            self.data["logs"] = []
-            changed = True
-        if changed:
+        missing = self._DEFAULTS.keys() - self.data.keys()
+        if missing:
+            self.data.update({k: copy.deepcopy(self._DEFAULTS[k]) for k in missing})
             self.save()
 
     def load(self):
-        if not os.path.exists(self.path):
-            self.data = {}
-            self.ensure_structure()
-            return
-        with open(self.path, "r", encoding="utf-8") as f:
+        if not os.path.exists(self.path) and os.path.exists(DATA_FILE):
+            self._migrate_legacy(DATA_FILE)
+        self.data = {}
+        for candidate in (self.path, self.path + ".bak"):
+            if not os.path.exists(candidate):
+                continue
+            with open(candidate, "rb") as f:
+                try:
+                    self.data = _loads(f.read())
+                    break
+                except json.JSONDecodeError:
+                    self.data = {}
+        self._tables = {}
+        self._stats = None
+        self.ensure_structure()
+
+    def table(self, name: str) -> List[Any]:
+        records = self._tables.get(name)
+        if records is None:
+            if name == "logs":
+                self._flush_logs()
+            records = list(self._read_jsonl(self._table_path(name)))
+            if name in INDEXED_TABLES:
+                # records queued since the last flush() aren't on disk yet
+                records.extend(self._pending[name])
+                self._build_indices(name, records)
+            self._tables[name] = records
+        return records
+
+    @property
+    def donors(self) -> List[Dict[str, Any]]:
+        return self.table("donors")
+
+    @property
+    def patients(self) -> List[Dict[str, Any]]:
+        return self.table("patients")
+
+    @property
+    def logs(self) -> List[Any]:
+        return self.table("logs")
+
+    def _build_indices(self, table: str, records: List[Dict[str, Any]]):
+        self.by_id[table] = {}
+        self.by_bt[table] = defaultdict(list)
+        self.names_lc[table] = []
+        for rec in records:
+            self._index_record(table, rec)
+
+    def _index_record(self, table: str, rec: Dict[str, Any]):
+        self.by_id[table].setdefault(rec.get("id"), []).append(rec)
+        self.by_bt[table][rec.get("blood_type")].append(rec)
+        self.names_lc[table].append(rec.get("name", "").lower())
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        if self._stats is None:
+            self._stats = {
+                "donors_total_ml": 0, "patients_total_ml": 0,
+                "by_bt_donated": Counter(), "by_bt_requested": Counter(),
+                "n_donors": 0, "n_patients": 0,
+            }
+            for table in INDEXED_TABLES:
+                for rec in self.table(table):
+                    self._count_record(table, rec)
+        return self._stats
+
+    def _count_record(self, table: str, rec: Dict[str, Any]):
+        stats = self._stats
+        if table == "donors":
+            amount = rec.get("donated_amount", 0)
+            stats["n_donors"] += 1
+            stats["donors_total_ml"] += amount
+            stats["by_bt_donated"][rec.get("blood_type")] += amount
+        else:
+            amount = rec.get("required_amount", 0)
+            stats["n_patients"] += 1
+            stats["patients_total_ml"] += amount
+            # credit the type actually drawn from inventory
+            stats["by_bt_requested"][rec.get("issued_type", rec.get("blood_type"))] += amount
+
+    def _migrate_legacy(self, legacy_path: str):
+        with open(legacy_path, "rb") as f:
             try:
-                self.data = json.load(f)
+                legacy = _loads(f.read())
             except json.JSONDecodeError:
-                self.data = {}
-        self.ensure_structure()
+                return
+        for table in RECORD_TABLES:
+            path = self._table_path(table)
+            if legacy.get(table) and not os.path.exists(path):
+                self._append_jsonl(path, legacy[table])
+        if "inventory" in legacy:
+            self.data = {"inventory": legacy["inventory"],
+                         "schema_version": self._DEFAULTS["schema_version"]}
+            self.save()
+
+    @staticmethod
+    def _read_jsonl(path: str) -> Iterator[Any]:
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield _loads(line)
+                except json.JSONDecodeError:
+                    # a torn last line from an interrupted append
+                    continue
+
+    @staticmethod
+    def _append_jsonl(path: str, records: Iterable[Any]):
+        lines = b"".join(_dumps_line(r) for r in records)
+        with open(path, "ab") as f:
+            f.write(lines)
 
     def save(self):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        snapshot = {"schema_version": self.data["schema_version"], "inventory": self.data["inventory"]}
+        _atomic_write(self.path, _dumps(snapshot))
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self._autoflush:
+            self.flush()
+
+    def add_record(self, table: str, record: Any):
+        self._pending[table].append(record)
+        records = self._tables.get(table)
+        if records is not None:
+            records.append(record)
+            self._index_record(table, record)
+        if self._stats is not None:
+            self._count_record(table, record)
+        if self._autoflush:
+            self.flush()
+
+    def flush(self):
+        for table, pending in self._pending.items():
+            if pending:
+                self._append_jsonl(self._table_path(table), pending)
+                pending.clear()
+        if self._dirty:
+            self.save()
+            self._dirty = False
+
+    def _log_worker(self):
+        while True:
+            item = self._log_q.get()
+            batch: List[Any] = []
+            waiters: List[threading.Event] = []
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while True:
+                if isinstance(item, threading.Event):
+                    # _flush_logs() is waiting: write what we have now
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= LOG_BATCH_SIZE or remaining <= 0:
+                    break
+                try:
+                    item = self._log_q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._append_jsonl(self.logs_path, batch)
+            for waiter in waiters:
+                waiter.set()
 
-    def log(self, entry: str):
-        timestamp = datetime.now().isoformat(sep=" ", timespec="seconds")
-        self.data.setdefault("logs", []).append(f"{timestamp} - {entry}")
-        self.save()
+    def _flush_logs(self):
+        done = threading.Event()
+        self._log_q.put(done)
+        done.wait(timeout=5)
+
+    def iter_logs(self) -> Iterator[Any]:
+        self._flush_logs()
+        return self._read_jsonl(self.logs_path)
+
+    def log(self, entry: str, ts: Optional[int] = None):
+        # Entries are stored as epoch seconds + message and only formatted
+        # when shown (see format_log_entry).
+        rec = {"ts": int(time.time()) if ts is None else ts, "msg": entry}
+        if "logs" in self._tables:
+            self._tables["logs"].append(rec)
+        self._log_q.put(rec)
+
+
+def format_log_entry(item: Any) -> str:
+    if isinstance(item, dict):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(item["ts"]))
+        return f"{stamp} - {item['msg']}"
+    return item  # legacy pre-formatted string
 
 
 class Inventory:
@@ -67,32 +329,71 @@ class Inventory:
 
     def get_amount(self, btype: str) -> int:
         inv = self._get_inventory()
-        return int(inv.get(btype, 0))
+        return inv.get(btype, 0)
 
-    def add_blood(self, btype: str, amount: int) -> bool:
+    def add_blood(self, btype: str, amount: int) -> Optional[int]:
         if btype not in Inventory.VALID_TYPES or amount <= 0:
-            return False
+            return None
         inv = self._get_inventory()
-        inv[btype] = inv.get(btype, 0) + amount
-        self.db.save()
-        self.db.log(f"Added {amount}ml to {btype} (new: {inv[btype]} ml)")
-        return True
+        new = inv.get(btype, 0) + amount
+        inv[btype] = new
+        self.db._mark_dirty()
+        self.db.log(f"Added {amount}ml to {btype} (new: {new} ml)")
+        return new
 
-    def remove_blood(self, btype: str, amount: int) -> bool:
+    def remove_blood(self, btype: str, amount: int) -> Optional[int]:
         if btype not in Inventory.VALID_TYPES or amount <= 0:
-            return False
+            return None
         inv = self._get_inventory()
         current = inv.get(btype, 0)
         if amount > current:
-            return False
-        inv[btype] = current - amount
-        self.db.save()
-        self.db.log(f"Removed {amount}ml from {btype} (remaining: {inv[btype]} ml)")
-        return True
+            return None
+        new = current - amount
+        inv[btype] = new
+        self.db._mark_dirty()
+        self.db.log(f"Removed {amount}ml from {btype} (remaining: {new} ml)")
+        return new
 
     def list_inventory(self) -> Dict[str, int]:
         return dict(self._get_inventory())
 
+    def view_inventory(self) -> Mapping[str, int]:
+        # read-only live view for display code; list_inventory() copies
+        return MappingProxyType(self._get_inventory())
+
+
+def _prompt_int(prompt: str, lo: Optional[int] = None, hi: Optional[int] = None, parse=int,
+                invalid: str = "Please enter a valid integer.",
+                out_of_range: Optional[str] = None) -> int:
+    # Validates with a string predicate rather than catching ValueError, so
+    # the same helper stays cheap when fed malformed rows in bulk.
+    while True:
+        s = input(prompt).strip()
+        digits = s[1:] if s[:1] in ("+", "-") else s
+        if not digits.isdecimal():
+            print(invalid)
+            continue
+        value = parse(s)
+        if (lo is not None and value < lo) or (hi is not None and value > hi):
+            print(out_of_range or f"Value must be between {lo} and {hi}.")
+            continue
+        return value
+
+
+def _prompt_btype(prompt: str) -> Optional[str]:
+    # accepts any casing ("o+") and returns the canonical type, or None
+    s = input(prompt).strip().upper()
+    return s if s in Inventory.VALID_TYPES else None
+
+
+def _prompt_yesno(prompt: str) -> Optional[bool]:
+    s = input(prompt).strip().lower()
+    if s in ("yes", "y"):
+        return True
+    if s in ("no", "n"):
+        return False
+    return None
+
 
 class Staff:
     def __init__(self):
@@ -105,20 +406,10 @@ class Staff:
     def input_basic(self):
         self.name = input("Enter your name: ").strip()
         self.email = input("Enter your email: ").strip()
-        while True:
-            try:
-                self.age = int(input("Enter your age: ").strip())
-                if 18 <= self.age <= 65:
-                    break
-                print("Age must be between 18 and 65.")
-            except ValueError:
-                print("Please enter a valid integer for age.")
-        while True:
-            try:
-                self.id = int(input("Enter your ID: ").strip())
-                break
-            except ValueError:
-                print("Please enter a numeric ID.")
+        self.age = _prompt_int("Enter your age: ", 18, 65,
+                               invalid="Please enter a valid integer for age.",
+                               out_of_range="Age must be between 18 and 65.")
+        self.id = _prompt_int("Enter your ID: ", invalid="Please enter a numeric ID.")
 
     def set_salary(self):
         while True:
@@ -138,12 +429,15 @@ class Staff:
 
 
 class Donor(Staff):
+    _DONOR_TEMPLATE: Dict[str, Any] = {
+        "name": None, "email": None, "age": 0, "id": 0, "phone": None,
+        "donated_amount": 0, "blood_type": None, "donation_date": None,
+    }
+
     def __init__(self, db: Database):
         super().__init__()
         self.phone: str = ""
-        self.day: int = 0
-        self.month: int = 0
-        self.year: int = 0
+        self.donation_date: Optional[date] = None
         self.blood_type: str = ""
         self.donated_amount: int = 0
         self.db = db
@@ -153,55 +447,49 @@ class Donor(Staff):
         self.phone = input("Enter your phone number: ").strip()
 
     def fitness_check(self) -> bool:
-        fitness = input("Do you suffer from chronic disease? (yes/no): ").strip().lower()
-        if fitness == "no":
+        if _prompt_yesno("Do you suffer from chronic disease? (yes/no): ") is False:
             print("Donation accepted.")
             return True
         print("Donation not allowed.")
         return False
 
     def donation_data(self):
+        self.donated_amount = _prompt_int("Enter donation amount (50-500 ml): ", 50, 500,
+                                          out_of_range="Amount must be between 50 and 500.")
         while True:
+            d = _prompt_int("Donation day (1-31): ", 1, 31)
+            m = _prompt_int("Donation month (1-12): ", 1, 12)
+            y = _prompt_int("Donation year (e.g., 2025): ", 1, 9999)
             try:
-                self.donated_amount = int(input("Enter donation amount (50-500 ml): ").strip())
-                if 50 <= self.donated_amount <= 500:
-                    break
-                print("Amount must be between 50 and 500.")
-            except ValueError:
-                print("Please enter a valid integer.")
-        while True:
-            try:
-                d = int(input("Donation day (1-31): ").strip())
-                m = int(input("Donation month (1-12): ").strip())
-                y = int(input("Donation year (e.g., 2025): ").strip())
-                datetime(y, m, d)
-                self.day, self.month, self.year = d, m, y
+                self.donation_date = date(y, m, d)
                 break
-            except (ValueError, OverflowError):
+            except ValueError:
                 print("Invalid date, enter again.")
-        print(f"Donation date: {self.day}/{self.month}/{self.year}")
+        dd = self.donation_date
+        print(f"Donation date: {dd.day}/{dd.month}/{dd.year}")
+
+    def _new_donor_rec(self, bt: str) -> Dict[str, Any]:
+        r = self._DONOR_TEMPLATE.copy()
+        r["name"] = self.name
+        r["email"] = self.email
+        r["age"] = self.age
+        r["id"] = self.id
+        r["phone"] = self.phone
+        r["donated_amount"] = self.donated_amount
+        r["blood_type"] = bt
+        r["donation_date"] = self.donation_date.isoformat()
+        return r
 
     def donate(self, inventory: Inventory):
-        bt = input("Enter blood type (A+/A-/B+/B-/AB+/AB-/O+/O-): ").strip()
-        if bt not in Inventory.VALID_TYPES:
+        bt = _prompt_btype("Enter blood type (A+/A-/B+/B-/AB+/AB-/O+/O-): ")
+        if bt is None:
             print("Wrong blood type.")
             return False
         self.blood_type = bt
-        ok = inventory.add_blood(bt, self.donated_amount)
-        if ok:
-            donor_rec = {
-                "name": self.name,
-                "email": self.email,
-                "age": self.age,
-                "id": self.id,
-                "phone": self.phone,
-                "donated_amount": self.donated_amount,
-                "blood_type": self.blood_type,
-                "donation_date": f"{self.year:04d}-{self.month:02d}-{self.day:02d}"
-            }
-            self.db.data.setdefault("donors", []).append(donor_rec)
-            self.db.save()
-            print("Donation recorded. Total for", bt, "=", inventory.get_amount(bt), "ml")
+        new = inventory.add_blood(bt, self.donated_amount)
+        if new is not None:
+            self.db.add_record("donors", self._new_donor_rec(bt))
+            print("Donation recorded. Total for", bt, "=", new, "ml")
             return True
         print("Failed to update inventory.")
         return False
@@ -214,6 +502,11 @@ class Donor(Staff):
 
 
 class Patient(Staff):
+    _PATIENT_TEMPLATE: Dict[str, Any] = {
+        "name": None, "email": None, "age": 0, "id": 0, "phone": None,
+        "required_amount": 0, "blood_type": None, "request_date": None,
+    }
+
     def __init__(self, db: Database):
         super().__init__()
         self.phone: str = ""
@@ -226,53 +519,56 @@ class Patient(Staff):
         self.phone = input("Enter your phone number: ").strip()
 
     def patient_data(self):
+        self.required_amount = _prompt_int("Enter required amount (ml): ", lo=1,
+                                           invalid="Enter a valid integer.",
+                                           out_of_range="Amount must be positive.")
         while True:
-            try:
-                self.required_amount = int(input("Enter required amount (ml): ").strip())
-                if self.required_amount > 0:
-                    break
-                print("Amount must be positive.")
-            except ValueError:
-                print("Enter a valid integer.")
-        valid = Inventory.VALID_TYPES
-        while True:
-            bt = input("Enter your blood type: ").strip()
-            if bt in valid:
+            bt = _prompt_btype("Enter your blood type: ")
+            if bt is not None:
                 self.blood_type = bt
                 break
             print("Invalid blood type. Try again.")
 
+    def compatible_types(self) -> Tuple[str, ...]:
+        return RECEIVABLE.get(self.blood_type, ())
+
     def get_types(self):
-        bt = self.blood_type
-        mapping = {
-            "O-": "O-",
-            "O+": "O-, O+",
-            "A-": "O-, A-",
-            "A+": "O-, O+, A-, A+",
-            "B-": "O-, B-",
-            "B+": "O-, O+, B-, B+",
-            "AB-": "O-, A-, B-, AB-",
-            "AB+": "All types"
-        }
-        print("You can receive from:", mapping.get(bt, "WRONG INPUT"))
+        print("You can receive from:", ", ".join(RECEIVABLE.get(self.blood_type, ("WRONG INPUT",))))
+
+    def _new_patient_rec(self, bt: str) -> Dict[str, Any]:
+        r = self._PATIENT_TEMPLATE.copy()
+        r["name"] = self.name
+        r["email"] = self.email
+        r["age"] = self.age
+        r["id"] = self.id
+        r["phone"] = self.phone
+        r["required_amount"] = self.required_amount
+        r["blood_type"] = bt
+        r["request_date"] = date.today().isoformat()
+        return r
 
     def request_blood(self, inventory: Inventory):
         bt = self.blood_type
-        success = inventory.remove_blood(bt, self.required_amount)
-        if success:
-            rec = {
-                "name": self.name,
-                "email": self.email,
-                "age": self.age,
-                "id": self.id,
-                "phone": self.phone,
-                "required_amount": self.required_amount,
-                "blood_type": bt,
-                "request_date": datetime.now().strftime("%Y-%m-%d")
-            }
-            self.db.data.setdefault("patients", []).append(rec)
-            self.db.save()
-            print("Request fulfilled. Remaining", bt, "=", inventory.get_amount(bt), "ml")
+        # Own type first, then the closest compatible substitute, O- last.
+        # A substitute is only issued once the user confirms it.
+        issued = remaining = None
+        for candidate in reversed(self.compatible_types()):
+            if candidate != bt:
+                if inventory.get_amount(candidate) < self.required_amount:
+                    continue
+                if not _prompt_yesno(f"Not enough {bt}. Issue compatible type {candidate} instead? (yes/no): "):
+                    break
+            remaining = inventory.remove_blood(candidate, self.required_amount)
+            if remaining is not None:
+                issued = candidate
+                break
+        if issued is not None:
+            rec = self._new_patient_rec(bt)
+            if issued != bt:
+                rec["issued_type"] = issued
+                print(f"Issued compatible type {issued} for {bt}.")
+            self.db.add_record("patients", rec)
+            print("Request fulfilled. Remaining", issued, "=", remaining, "ml")
             return True
         else:
             print("There is not enough amount or invalid type.")
@@ -288,51 +584,32 @@ class Patient(Staff):
 def generate_reports(db: Database, inv: Inventory):
     print("\n===== Blood Bank Reports =====")
     
-    donors = db.data.get("donors", [])
-    patients = db.data.get("patients", [])
+    stats = db.stats
     
     # 1. Donation Statistics
-    total_donors = len(donors)
-    total_donated_amount = sum(d.get("donated_amount", 0) for d in donors)
-    
     print("\n--- Donation Statistics ---")
-    print(f"Total Donors Registered: {total_donors}")
-    print(f"Total Blood Donated: {total_donated_amount} ml")
+    print(f"Total Donors Registered: {stats['n_donors']}")
+    print(f"Total Blood Donated: {stats['donors_total_ml']} ml")
     
     # 2. Request Statistics
-    total_patients = len(patients)
-    total_requested_amount = sum(p.get("required_amount", 0) for p in patients)
-    
     print("\n--- Request Statistics ---")
-    print(f"Total Patients Registered: {total_patients}")
-    print(f"Total Blood Requested: {total_requested_amount} ml")
+    print(f"Total Patients Registered: {stats['n_patients']}")
+    print(f"Total Blood Requested: {stats['patients_total_ml']} ml")
     
     # 3. Inventory Summary (re-using print_inventory logic)
     print("\n--- Current Inventory Summary (ml) ---")
-    inv_map = inv.list_inventory()
-    for bt in sorted(inv_map.keys()):
-        print(f"{bt:3}: {inv_map[bt]:5} ml")
+    inv_map = inv.view_inventory()
+    for bt in SORTED_TYPES:
+        print(f"{bt:3}: {inv_map.get(bt, 0):5} ml")
     
     # 4. Activity by Blood Type
-    donation_by_type = {bt: 0 for bt in Inventory.VALID_TYPES}
-    request_by_type = {bt: 0 for bt in Inventory.VALID_TYPES}
-    
-    for d in donors:
-        bt = d.get("blood_type")
-        amount = d.get("donated_amount", 0)
-        if bt in donation_by_type:
-            donation_by_type[bt] += amount
-            
-    for p in patients:
-        bt = p.get("blood_type")
-        amount = p.get("required_amount", 0)
-        if bt in request_by_type:
-            request_by_type[bt] += amount
+    donation_by_type = stats["by_bt_donated"]
+    request_by_type = stats["by_bt_requested"]
 
     print("\n--- Activity by Blood Type (ml) ---")
     print(f"{'Type':<5} | {'Donated':<10} | {'Requested':<10}")
     print("-" * 30)
-    for bt in sorted(Inventory.VALID_TYPES):
+    for bt in SORTED_TYPES:
         print(f"{bt:<5} | {donation_by_type[bt]:<10} | {request_by_type[bt]:<10}")
         
     db.log("Generated comprehensive reports.")
@@ -341,7 +618,9 @@ def generate_reports(db: Database, inv: Inventory):
 
 def check_alerts(inv: Inventory):
     alerts = []
-    for btype, amount in inv.list_inventory().items():
+    inv_map = inv.view_inventory()
+    for btype in SORTED_TYPES:
+        amount = inv_map.get(btype, 0)
         if amount < CRITICAL_THRESHOLD:
             alerts.append(f"ALERT: {btype} is critically low! Current level: {amount} ml (Threshold: {CRITICAL_THRESHOLD} ml)")
     
@@ -354,10 +633,10 @@ def check_alerts(inv: Inventory):
     return False
 
 def print_inventory(inv: Inventory):
-    inv_map = inv.list_inventory()
+    inv_map = inv.view_inventory()
     print("\n===== Current Inventory (ml) =====")
-    for bt in sorted(inv_map.keys()):
-        print(f"{bt:3}: {inv_map[bt]:5} ml")
+    for bt in SORTED_TYPES:
+        print(f"{bt:3}: {inv_map.get(bt, 0):5} ml")
     print("==================================")
     input("Press Enter to return to menu...")
 
@@ -378,22 +657,17 @@ def search_records(db: Database):
             print("Search term cannot be empty.")
             continue
 
-        records = db.data.get(search_for, [])
-        results = []
-
-        for record in records:
-            # Search by Name (partial, case-insensitive)
-            if search_term in record.get("name", "").lower():
-                results.append(record)
-                continue
+        records = db.table(search_for)  # loads the table and its indices
+        if search_term.isdigit():
             # Search by ID (exact match)
-            if search_term.isdigit() and int(search_term) == record.get("id"):
-                results.append(record)
-                continue
+            results = list(db.by_id[search_for].get(int(search_term), []))
+        elif search_term.upper() in Inventory.VALID_TYPES:
             # Search by Blood Type (exact match, case-insensitive)
-            if search_term == record.get("blood_type", "").lower():
-                results.append(record)
-                continue
+            results = list(db.by_bt[search_for].get(search_term.upper(), []))
+        else:
+            # Search by Name (partial, case-insensitive)
+            results = [record for record, name_lc in zip(records, db.names_lc[search_for])
+                       if search_term in name_lc]
 
         print(f"\n--- {len(results)} Result(s) Found for '{search_term}' in {search_for} ---")
         if results:
@@ -419,7 +693,7 @@ def view_transaction_history(db: Database):
             continue
 
         records_key = "donors" if choice == '1' else "patients"
-        records = db.data.get(records_key, [])
+        records = db.table(records_key)
         
         print(f"\n--- {records_key.title()} History ({len(records)} Records) ---")
         if not records:
@@ -435,14 +709,17 @@ def view_transaction_history(db: Database):
         input("Press Enter to return to history menu...")
 
 
-def print_logs(db: Database):
-    logs = db.data.get("logs", [])
+def print_logs(db: Database, tail: Optional[int] = None):
+    entries = db.iter_logs()
+    if tail is not None:
+        entries = deque(entries, maxlen=tail)
     print("\n===== System Logs =====")
-    if not logs:
+    shown = False
+    for item in entries:
+        print(format_log_entry(item))
+        shown = True
+    if not shown:
         print("No logs available.")
-    else:
-        for line in logs:
-            print(line)
     print("========================")
     input("Press Enter to return to menu...")
 
@@ -453,66 +730,74 @@ def main():
 
     print("===== WELCOME TO OUR BLOODBANK SYSTEM =====")
 
-    while True:
-        check_alerts(inventory)
-        print("\nMenu:")
-        print("1 - Staff (enter/display/set salary)")
-        print("2 - Donor (register & donate)")
-        print("3 - Patient (request blood)")
-        print("4 - View Inventory")
-        print("5 - View System Logs")
-        print("6 - Search Records")
-        print("7 - Generate Reports")
-        print("8 - View Transaction History")
-        print("0 - Exit")
-
-        choice = input("Enter choice: ").strip()
-
-        if choice == "1":
-            s = Staff()
-            s.input_basic()
-            s.set_salary()
-            s.display()
-            print(f"Salary: {s.salary}")
-            db.log(f"Staff entry: {s.name} (ID: {s.id})")
-            input("Press Enter to return to menu...")
-        elif choice == "2":
-            d = Donor(db)
-            d.input_donor()
-            if d.fitness_check():
-                d.donation_data()
-                if d.donate(inventory):
-                    print("Donation successful.")
+    try:
+        while True:
+            check_alerts(inventory)
+            print("\nMenu:")
+            print("1 - Staff (enter/display/set salary)")
+            print("2 - Donor (register & donate)")
+            print("3 - Patient (request blood)")
+            print("4 - View Inventory")
+            print("5 - View System Logs")
+            print("6 - Search Records")
+            print("7 - Generate Reports")
+            print("8 - View Transaction History")
+            print("0 - Exit")
+
+            choice = input("Enter choice: ").strip()
+
+            if choice == "1":
+                s = Staff()
+                s.input_basic()
+                s.set_salary()
+                s.display()
+                print(f"Salary: {s.salary}")
+                db.log(f"Staff entry: {s.name} (ID: {s.id})")
+                db.flush()
+                input("Press Enter to return to menu...")
+            elif choice == "2":
+                d = Donor(db)
+                d.input_donor()
+                if d.fitness_check():
+                    d.donation_data()
+                    if d.donate(inventory):
+                        print("Donation successful.")
+                    else:
+                        print("Donation failed.")
+                    d.display()
+                db.flush()
+                input("Press Enter to return to menu...")
+            elif choice == "3":
+                p = Patient(db)
+                p.input_patient()
+                p.patient_data()
+                p.get_types()
+                if p.request_blood(inventory):
+                    print("Request completed.")
                 else:
-                    print("Donation failed.")
-                d.display()
-            input("Press Enter to return to menu...")
-        elif choice == "3":
-            p = Patient(db)
-            p.input_patient()
-            p.patient_data()
-            p.get_types()
-            if p.request_blood(inventory):
-                print("Request completed.")
+                    print("Request failed.")
+                p.display()
+                db.flush()
+                input("Press Enter to return to menu...")
+            elif choice == "4":
+                print_inventory(inventory)
+            elif choice == "5":
+                scope = input("Show (1) All logs or (2) Last 100 entries? ").strip()
+                print_logs(db, tail=100 if scope == "2" else None)
+            elif choice == "6":
+                search_records(db)
+            elif choice == "7":
+                generate_reports(db, inventory)
+            elif choice == "8":
+                view_transaction_history(db)
+            elif choice == "0":
+                print("Thank you for using our blood bank system.")
+                break
             else:
-                print("Request failed.")
-            p.display()
-            input("Press Enter to return to menu...")
-        elif choice == "4":
-            print_inventory(inventory)
-        elif choice == "5":
-            print_logs(db)
-        elif choice == "6":
-            search_records(db)
-        elif choice == "7":
-            generate_reports(db, inventory)
-        elif choice == "8":
-            view_transaction_history(db)
-        elif choice == "0":
-            print("Thank you for using our blood bank system.")
-            break
-        else:
-            print("Invalid choice. Try again.")
+                print("Invalid choice. Try again.")
+            db.flush()
+    finally:
+        db.flush()
 
 
 if __name__ == "__main__":
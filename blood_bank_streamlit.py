@@ -1,19 +1,105 @@
 import streamlit as st
+import numpy as np
+import pandas as pd
+import atexit
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any, List
+import threading
+import time
+import types
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Any, ClassVar, DefaultDict, FrozenSet, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
 
 # ==================== Configuration ====================
-DATA_FILE = "blood_bank_data.json"
+DATA_FILE = "blood_bank_data.json"  # legacy single-file store, migrated on first load
+SNAPSHOT_FILE = "blood_bank_snapshot.json"
+EVENTS_FILE = "blood_bank_events.jsonl"
+COMPACT_THRESHOLD = 1 << 20  # bytes of events before the snapshot is rewritten
+CACHE_MAX_ENTRIES = 16  # per cached builder; older revisions are evicted
+LOG_FLUSH_THRESHOLD = 32  # buffered log lines before they are written out
+INDEXED_TABLES = ("donors", "patients")
 CRITICAL_THRESHOLD = 500  # ml
 
+# Donor types each recipient type can receive, as shown on Patient Request
+COMPAT = types.MappingProxyType({
+    "O-": "O-",
+    "O+": "O-, O+",
+    "A-": "O-, A-",
+    "A+": "O-, O+, A-, A+",
+    "B-": "O-, B-",
+    "B+": "O-, O+, B-, B+",
+    "AB-": "O-, A-, B-, AB-",
+    "AB+": "All types"
+})
+
+# ==================== JSON Helpers ====================
+def _dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _dumps_line(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _atomic_write(path: str, payload: bytes):
+    # Write to a sibling temp file and rename it over the target so a crash
+    # never leaves a truncated snapshot behind. The fsync matters because
+    # compact() truncates the event log right after.
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
 # ==================== Database Class ====================
+# State lives in a snapshot plus an append-only event log: every mutation
+# appends one JSON line to EVENTS_FILE, and load() replays the events on top
+# of the snapshot. compact() folds them back into the snapshot once the log
+# passes COMPACT_THRESHOLD, and again on shutdown.
 class Database:
-    def __init__(self, path: str = DATA_FILE):
+    def __init__(self, path: str = SNAPSHOT_FILE, events_path: str = EVENTS_FILE):
         self.path = path
+        self.events_path = events_path
         self.data: Dict[str, Any] = {}
+        # One Database is shared by every session through st.cache_resource,
+        # so mutations are serialized on this lock.
+        self.lock = threading.RLock()
+        # Bumped on every inventory/donor/patient change (not on log lines);
+        # the st.cache_data builders below are keyed on it.
+        self.rev = 0
+        # Per-table lookup indices for Search Records, kept in sync by
+        # add_donor/add_patient. names_lc is parallel to self.data[table].
+        self.by_id: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+        self.by_bt: Dict[str, DefaultDict[str, List[Dict[str, Any]]]] = {}
+        self.names_lc: Dict[str, List[str]] = {}
+        # Column-oriented copy of each record table for Transaction History;
+        # a field first seen on a later record is backfilled with None.
+        self.cols: Dict[str, Dict[str, List[Any]]] = {}
+        # Log lines are already in data["logs"]; this holds the ones not yet
+        # written to the event log. Any other event flushes it first so seqs
+        # stay in file order.
+        self._log_buf: List[str] = []
         self.load()
+        self._events = open(self.events_path, "ab")
+        atexit.register(self.compact)
 
     def ensure_structure(self):
         changed = False
@@ -23,6 +109,11 @@ class Database:
                 "AB+": 2000, "AB-": 2000, "O+": 2000, "O-": 2000
             }
             changed = True
+        for btype in Inventory.VALID_TYPES:
+            # Older files may omit a type; Inventory indexes every type directly
+            if btype not in self.data["inventory"]:
+                self.data["inventory"][btype] = 0
+                changed = True
         if "donors" not in self.data:
             self.data["donors"] = []
             changed = True
@@ -32,97 +123,280 @@ class Database:
         if "logs" not in self.data:
             self.data["logs"] = []
             changed = True
+        if "seq" not in self.data:
+            self.data["seq"] = 0
+            changed = True
+        if "totals" not in self.data:
+            # Legacy file: count once here, then maintain at insert time
+            self.data["totals"] = {"donated": 0, "requested": 0, "donor_count": 0, "patient_count": 0}
+            for d in self.data["donors"]:
+                self._tally_donor(d)
+            for p in self.data["patients"]:
+                self._tally_patient(p)
+            changed = True
+        # Direct references to the record lists; reset whenever data is replaced
+        self.donors: List[Dict[str, Any]] = self.data["donors"]
+        self.patients: List[Dict[str, Any]] = self.data["patients"]
+        self.logs: List[str] = self.data["logs"]
         if changed:
             self.save()
 
     def load(self):
-        if not os.path.exists(self.path):
-            self.data = {}
-            self.ensure_structure()
-            return
-        with open(self.path, "r", encoding="utf-8") as f:
-            try:
-                self.data = json.load(f)
-            except json.JSONDecodeError:
-                self.data = {}
+        source = self.path if os.path.exists(self.path) else DATA_FILE
+        self.data = {}
+        if os.path.exists(source):
+            with open(source, "rb") as f:
+                try:
+                    self.data = _loads(f.read())
+                except json.JSONDecodeError:
+                    self.data = {}
         self.ensure_structure()
+        self._replay()
+        self._build_indices()
+
+    def _build_indices(self):
+        for table in INDEXED_TABLES:
+            self.by_id[table] = {}
+            self.by_bt[table] = defaultdict(list)
+            self.names_lc[table] = []
+            self.cols[table] = {}
+            for rec in self.data[table]:
+                self._index_record(table, rec)
+
+    def _index_record(self, table: str, rec: Dict[str, Any]):
+        self.by_id[table].setdefault(rec.get("id"), []).append(rec)
+        self.by_bt[table][rec.get("blood_type")].append(rec)
+        self.names_lc[table].append(rec.get("name", "").lower())
+        cols = self.cols[table]
+        n = len(self.names_lc[table]) - 1  # rows already in cols
+        for key in rec:
+            if key not in cols:
+                cols[key] = [None] * n
+        for key, col in cols.items():
+            col.append(rec.get(key))
+
+    def _replay(self):
+        if not os.path.exists(self.events_path):
+            return
+        with open(self.events_path, "rb") as f:
+            for line in f:
+                try:
+                    event = _loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted append
+                # events already folded into the snapshot by compact()
+                if event["seq"] <= self.data["seq"]:
+                    continue
+                self._apply(event["kind"], event["payload"])
+                self.data["seq"] = event["seq"]
+
+    def _apply(self, kind: str, payload: Any):
+        if kind == "inv":
+            self.data["inventory"][payload["btype"]] = payload["amount"]
+        elif kind == "donor":
+            self.donors.append(payload)
+            self._tally_donor(payload)
+        elif kind == "patient":
+            self.patients.append(payload)
+            self._tally_patient(payload)
+        elif kind == "log":
+            self.logs.append(payload)
+
+    def _tally_donor(self, rec: Dict[str, Any]):
+        totals = self.data["totals"]
+        totals["donated"] += rec.get("donated_amount", 0)
+        totals["donor_count"] += 1
+
+    def _tally_patient(self, rec: Dict[str, Any]):
+        totals = self.data["totals"]
+        totals["requested"] += rec.get("required_amount", 0)
+        totals["patient_count"] += 1
+
+    def _write_event(self, kind: str, payload: Any):
+        self.data["seq"] += 1
+        event = {"seq": self.data["seq"], "ts": time.time(), "kind": kind, "payload": payload}
+        self._events.write(_dumps_line(event))
+
+    def _drain_logs(self):
+        for line in self._log_buf:
+            self._write_event("log", line)
+        self._log_buf.clear()
+
+    def _sync(self):
+        self._events.flush()
+        if self._events.tell() > COMPACT_THRESHOLD:
+            self.compact()
+
+    def _append_event(self, kind: str, payload: Any):
+        self._drain_logs()
+        self._write_event(kind, payload)
+        self._sync()
+
+    def _flush_logs(self):
+        with self.lock:
+            if self._log_buf:
+                self._drain_logs()
+                self._sync()
 
     def save(self):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        _atomic_write(self.path, _dumps(self.data))
+
+    def compact(self):
+        # The snapshot records the last applied seq, so a crash between the
+        # two steps only leaves events that load() will skip.
+        with self.lock:
+            # Buffered log lines are already in data["logs"]
+            self._log_buf.clear()
+            self.save()
+            self._events.seek(0)
+            self._events.truncate()
+
+    def set_inventory(self, btype: str, amount: int):
+        with self.lock:
+            self.data["inventory"][btype] = amount
+            self.rev += 1
+            self._append_event("inv", {"btype": btype, "amount": amount})
+
+    def add_donor(self, rec: Dict[str, Any]):
+        with self.lock:
+            self.donors.append(rec)
+            self._tally_donor(rec)
+            self._index_record("donors", rec)
+            self.rev += 1
+            self._append_event("donor", rec)
+
+    def add_patient(self, rec: Dict[str, Any]):
+        with self.lock:
+            self.patients.append(rec)
+            self._tally_patient(rec)
+            self._index_record("patients", rec)
+            self.rev += 1
+            self._append_event("patient", rec)
 
-    def log(self, entry: str):
-        timestamp = datetime.now().isoformat(sep=" ", timespec="seconds")
-        self.data.setdefault("logs", []).append(f"{timestamp} - {entry}")
-        self.save()
+    def log(self, entry: str, ts: Optional[str] = None):
+        timestamp = ts or datetime.now().isoformat(sep=" ", timespec="seconds")
+        line = f"{timestamp} - {entry}"
+        with self.lock:
+            self.logs.append(line)
+            self._log_buf.append(line)
+            if len(self._log_buf) >= LOG_FLUSH_THRESHOLD:
+                self._flush_logs()
 
 
 # ==================== Inventory Class ====================
 class Inventory:
-    VALID_TYPES = {"A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"}
+    # Sorted tuple for widget options and table order; the frozenset is for
+    # membership tests.
+    VALID_TYPES: ClassVar[Tuple[str, ...]] = ("A+", "A-", "AB+", "AB-", "B+", "B-", "O+", "O-")
+    VALID_TYPES_SET: ClassVar[FrozenSet[str]] = frozenset(VALID_TYPES)
 
     def __init__(self, db: Database):
         self.db = db
+        self.rebind()
 
-    def _get_inventory(self) -> Dict[str, int]:
-        return self.db.data["inventory"]
+    def rebind(self):
+        # Cached reference to the inventory dict; call again if the
+        # Database reloads and replaces self.data.
+        self._inv: Dict[str, int] = self.db.data["inventory"]
 
     def get_amount(self, btype: str) -> int:
-        inv = self._get_inventory()
-        return int(inv.get(btype, 0))
+        return self._inv.get(btype, 0)
 
     def add_blood(self, btype: str, amount: int) -> bool:
-        if btype not in Inventory.VALID_TYPES or amount <= 0:
+        if btype not in Inventory.VALID_TYPES_SET or amount <= 0:
             return False
-        inv = self._get_inventory()
-        inv[btype] = inv.get(btype, 0) + amount
-        self.db.save()
-        self.db.log(f"Added {amount}ml to {btype} (new: {inv[btype]} ml)")
+        with self.db.lock:
+            new = self._inv[btype] + amount
+            self.db.set_inventory(btype, new)
+            self.db.log(f"Added {amount}ml to {btype} (new: {new} ml)")
         return True
 
     def remove_blood(self, btype: str, amount: int) -> bool:
-        if btype not in Inventory.VALID_TYPES or amount <= 0:
+        if btype not in Inventory.VALID_TYPES_SET or amount <= 0:
             return False
-        inv = self._get_inventory()
-        current = inv.get(btype, 0)
-        if amount > current:
-            return False
-        inv[btype] = current - amount
-        self.db.save()
-        self.db.log(f"Removed {amount}ml from {btype} (remaining: {inv[btype]} ml)")
+        with self.db.lock:
+            current = self._inv[btype]
+            if amount > current:
+                return False
+            remaining = current - amount
+            self.db.set_inventory(btype, remaining)
+            self.db.log(f"Removed {amount}ml from {btype} (remaining: {remaining} ml)")
         return True
 
     def list_inventory(self) -> Dict[str, int]:
-        return dict(self._get_inventory())
+        return dict(self._inv)
+
+
+# ==================== Shared Resources ====================
+@st.cache_resource
+def get_db() -> Database:
+    return Database()
+
+
+@st.cache_resource
+def get_inventory(_db: Database) -> Inventory:
+    return Inventory(_db)
+
+
+# ==================== Cached DataFrames ====================
+# Keyed on Database.rev; the leading underscore keeps Streamlit from hashing
+# the record lists themselves on every rerun.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def build_inventory_df(rev: int, _inv: Dict[str, int]):
+    inv_series = pd.Series(_inv, name="Amount (ml)").reindex(Inventory.VALID_TYPES)
+    status = np.where(inv_series.values >= CRITICAL_THRESHOLD, "🟢 Good", "🔴 Critical")
+    return pd.DataFrame({
+        "Blood Type": inv_series.index,
+        "Amount (ml)": inv_series.values,
+        "Status": status
+    })
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def build_report_df(rev: int, _donors: List[Dict[str, Any]], _patients: List[Dict[str, Any]]):
+    d_df = pd.DataFrame(_donors, columns=["blood_type", "donated_amount"])
+    r_df = pd.DataFrame(_patients, columns=["blood_type", "required_amount"])
+    donated = d_df.groupby("blood_type")["donated_amount"].sum().rename("Donated (ml)")
+    requested = r_df.groupby("blood_type")["required_amount"].sum().rename("Requested (ml)")
+    report = (
+        pd.concat([donated, requested], axis=1)
+        .reindex(Inventory.VALID_TYPES)
+        .fillna(0)
+        .astype(int)
+    )
+    report["Net (ml)"] = report["Donated (ml)"] - report["Requested (ml)"]
+    return report.rename_axis("Blood Type").reset_index()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES)
+def history_df(rev: int, table: str, _cols: Dict[str, List[Any]]):
+    return pd.DataFrame(_cols)
+
+
+def show_inventory_table(db: Database, inventory: Inventory):
+    # Shared by the Dashboard and Inventory pages
+    st.dataframe(build_inventory_df(db.rev, inventory.list_inventory()), use_container_width=True)
 
 
 # ==================== Streamlit App ====================
 def main():
     st.set_page_config(page_title="Blood Bank System", layout="wide")
     
-    # Initialize session state
-    if 'db' not in st.session_state:
-        st.session_state.db = Database()
-        st.session_state.inventory = Inventory(st.session_state.db)
+    db = get_db()
+    inventory = get_inventory(db)
     
-    db = st.session_state.db
-    inventory = st.session_state.inventory
+    # One clock read per rerun, shared by every log line and record below
+    now = datetime.now()
+    now_iso = now.isoformat(sep=" ", timespec="seconds")
+    now_date = now.strftime("%Y-%m-%d")
     
     # ==================== Header ====================
     st.title("🩸 Blood Bank Management System")
     st.markdown("---")
     
     # ==================== Check Alerts ====================
-    alerts = []
-    for btype, amount in inventory.list_inventory().items():
-        if amount < CRITICAL_THRESHOLD:
-            alerts.append(f"⚠️ **{btype}** is critically low! Current: {amount} ml (Threshold: {CRITICAL_THRESHOLD} ml)")
-    
-    if alerts:
-        st.warning("### 🚨 INVENTORY ALERTS")
-        for alert in alerts:
-            st.write(alert)
-        st.markdown("---")
+    # Filled in after the page has run so alerts reflect this run's changes
+    alert_box = st.container()
     
     # ==================== Sidebar Navigation ====================
     st.sidebar.title("Navigation")
@@ -142,34 +416,22 @@ def main():
     if page == "Dashboard":
         st.header("📊 Dashboard")
         
+        totals = db.data["totals"]
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total Donors", len(db.data.get("donors", [])))
+            st.metric("Total Donors", totals["donor_count"])
         with col2:
-            st.metric("Total Patients", len(db.data.get("patients", [])))
+            st.metric("Total Patients", totals["patient_count"])
         with col3:
-            total_donated = sum(d.get("donated_amount", 0) for d in db.data.get("donors", []))
-            st.metric("Total Donated (ml)", total_donated)
+            st.metric("Total Donated (ml)", totals["donated"])
         with col4:
-            total_requested = sum(p.get("required_amount", 0) for p in db.data.get("patients", []))
-            st.metric("Total Requested (ml)", total_requested)
+            st.metric("Total Requested (ml)", totals["requested"])
         
         st.markdown("---")
         st.subheader("📦 Inventory Status")
         
-        inv = inventory.list_inventory()
-        inv_df_data = []
-        for btype in sorted(inv.keys()):
-            status = "🟢 Good" if inv[btype] >= CRITICAL_THRESHOLD else "🔴 Critical"
-            inv_df_data.append({
-                "Blood Type": btype,
-                "Amount (ml)": inv[btype],
-                "Status": status
-            })
-        
-        import pandas as pd
-        st.dataframe(pd.DataFrame(inv_df_data), use_container_width=True)
+        show_inventory_table(db, inventory)
     
     # ==================== Staff Management ====================
     elif page == "Staff Management":
@@ -193,7 +455,7 @@ def main():
         
         if st.button("Register Staff"):
             if name and email:
-                db.log(f"Staff entry: {name} (ID: {staff_id}, Salary: {salary})")
+                db.log(f"Staff entry: {name} (ID: {staff_id}, Salary: {salary})", ts=now_iso)
                 st.success(f"✅ Staff {name} registered successfully!")
                 st.write(f"**Name:** {name}")
                 st.write(f"**Email:** {email}")
@@ -235,15 +497,10 @@ def main():
             
             donation_amount = st.slider("Donation Amount (ml)", min_value=50, max_value=500, value=250, step=50)
             
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                donation_day = st.number_input("Day", min_value=1, max_value=31, value=1, key="donation_day")
-            with col2:
-                donation_month = st.number_input("Month", min_value=1, max_value=12, value=1, key="donation_month")
-            with col3:
-                donation_year = st.number_input("Year", min_value=2020, max_value=2025, value=2025, key="donation_year")
+            donation_date = st.date_input("Donation Date", value=date(2025, 1, 1),
+                                          min_value=date(2020, 1, 1), max_value=date(2025, 12, 31))
             
-            blood_type = st.selectbox("Blood Type", list(Inventory.VALID_TYPES))
+            blood_type = st.selectbox("Blood Type", Inventory.VALID_TYPES)
             
             if st.button("Complete Donation"):
                 try:
@@ -257,10 +514,9 @@ def main():
                                 "phone": donor_phone,
                                 "donated_amount": donation_amount,
                                 "blood_type": blood_type,
-                                "donation_date": f"{donation_year:04d}-{donation_month:02d}-{donation_day:02d}"
+                                "donation_date": donation_date.isoformat()
                             }
-                            db.data.setdefault("donors", []).append(donor_rec)
-                            db.save()
+                            db.add_donor(donor_rec)
                             st.success(f"✅ Donation successful! {blood_type} now has {inventory.get_amount(blood_type)} ml")
                         else:
                             st.error("❌ Failed to update inventory.")
@@ -292,21 +548,11 @@ def main():
         st.markdown("---")
         st.subheader("Blood Request Details")
         
-        patient_blood_type = st.selectbox("Blood Type", list(Inventory.VALID_TYPES), key="patient_blood_type")
+        patient_blood_type = st.selectbox("Blood Type", Inventory.VALID_TYPES, key="patient_blood_type")
         required_amount = st.number_input("Required Amount (ml)", min_value=1, value=250)
         
         # Display compatible blood types
-        mapping = {
-            "O-": "O-",
-            "O+": "O-, O+",
-            "A-": "O-, A-",
-            "A+": "O-, O+, A-, A+",
-            "B-": "O-, B-",
-            "B+": "O-, O+, B-, B+",
-            "AB-": "O-, A-, B-, AB-",
-            "AB+": "All types"
-        }
-        st.info(f"✅ Compatible blood types: {mapping.get(patient_blood_type, 'Unknown')}")
+        st.info(f"✅ Compatible blood types: {COMPAT.get(patient_blood_type, 'Unknown')}")
         
         if st.button("Request Blood"):
             try:
@@ -320,10 +566,9 @@ def main():
                             "phone": patient_phone,
                             "required_amount": required_amount,
                             "blood_type": patient_blood_type,
-                            "request_date": datetime.now().strftime("%Y-%m-%d")
+                            "request_date": now_date
                         }
-                        db.data.setdefault("patients", []).append(patient_rec)
-                        db.save()
+                        db.add_patient(patient_rec)
                         st.success(f"✅ Request fulfilled! {patient_blood_type} remaining: {inventory.get_amount(patient_blood_type)} ml")
                     else:
                         st.error(f"❌ Insufficient {patient_blood_type} blood. Available: {inventory.get_amount(patient_blood_type)} ml")
@@ -336,42 +581,36 @@ def main():
     elif page == "Inventory":
         st.header("📦 Blood Inventory")
         
-        inv = inventory.list_inventory()
-        inv_data = []
-        
-        for btype in sorted(inv.keys()):
-            inv_data.append({
-                "Blood Type": btype,
-                "Amount (ml)": inv[btype],
-                "Status": "🟢 Good" if inv[btype] >= CRITICAL_THRESHOLD else "🔴 Critical"
-            })
-        
-        import pandas as pd
-        st.dataframe(pd.DataFrame(inv_data), use_container_width=True)
+        # Drawn after the form is handled so it shows the adjusted amounts
+        table_box = st.empty()
         
         st.markdown("---")
         st.subheader("Manual Inventory Adjustment")
         
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            action = st.radio("Action", ["Add", "Remove"])
-        with col2:
-            btype = st.selectbox("Blood Type", list(Inventory.VALID_TYPES), key="inv_btype")
-        with col3:
-            amount = st.number_input("Amount (ml)", min_value=1, value=100, key="inv_amount")
+        with st.form("inv_adjust"):
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                action = st.radio("Action", ["Add", "Remove"])
+            with col2:
+                btype = st.selectbox("Blood Type", Inventory.VALID_TYPES, key="inv_btype")
+            with col3:
+                amount = st.number_input("Amount (ml)", min_value=1, value=100, key="inv_amount")
+            
+            submitted = st.form_submit_button("Apply")
         
-        if st.button("Apply"):
+        if submitted:
             if action == "Add":
                 if inventory.add_blood(btype, amount):
                     st.success(f"✅ Added {amount} ml to {btype}")
-                    st.rerun()
             else:
                 if inventory.remove_blood(btype, amount):
                     st.success(f"✅ Removed {amount} ml from {btype}")
-                    st.rerun()
                 else:
                     st.error(f"❌ Insufficient amount. Available: {inventory.get_amount(btype)} ml")
+        
+        with table_box:
+            show_inventory_table(db, inventory)
     
     # ==================== Search Records ====================
     elif page == "Search Records":
@@ -382,25 +621,21 @@ def main():
         
         if st.button("Search"):
             search_for = "donors" if search_type == "Donor" else "patients"
-            records = db.data.get(search_for, [])
-            results = []
             
-            search_term_lower = search_term.lower()
-            
-            for record in records:
-                if search_term_lower in record.get("name", "").lower():
-                    results.append(record)
-                elif search_term.isdigit() and int(search_term) == record.get("id"):
-                    results.append(record)
-                elif search_term_lower == record.get("blood_type", "").lower():
-                    results.append(record)
+            if search_term.isdigit():
+                results = list(db.by_id[search_for].get(int(search_term), []))
+            elif search_term.upper() in Inventory.VALID_TYPES_SET:
+                results = list(db.by_bt[search_for].get(search_term.upper(), []))
+            else:
+                search_term_lower = search_term.lower()
+                results = [record for record, name_lc in zip(db.data[search_for], db.names_lc[search_for])
+                           if search_term_lower in name_lc]
             
-            db.log(f"Search performed for '{search_term}' in {search_for}. Found {len(results)} records.")
+            db.log(f"Search performed for '{search_term}' in {search_for}. Found {len(results)} records.", ts=now_iso)
             
             st.write(f"**Found {len(results)} result(s)**")
             
             if results:
-                import pandas as pd
                 st.dataframe(pd.DataFrame(results), use_container_width=True)
             else:
                 st.info("No matching records found.")
@@ -409,50 +644,29 @@ def main():
     elif page == "Reports":
         st.header("📊 Reports")
         
-        donors = db.data.get("donors", [])
-        patients = db.data.get("patients", [])
+        donors = db.donors
+        patients = db.patients
+        totals = db.data["totals"]
+        report_df = build_report_df(db.rev, donors, patients)
         
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Donation Statistics")
-            st.metric("Total Donors", len(donors))
-            st.metric("Total Donated (ml)", sum(d.get("donated_amount", 0) for d in donors))
+            st.metric("Total Donors", totals["donor_count"])
+            st.metric("Total Donated (ml)", totals["donated"])
         
         with col2:
             st.subheader("Request Statistics")
-            st.metric("Total Patients", len(patients))
-            st.metric("Total Requested (ml)", sum(p.get("required_amount", 0) for p in patients))
+            st.metric("Total Patients", totals["patient_count"])
+            st.metric("Total Requested (ml)", totals["requested"])
         
         st.markdown("---")
         st.subheader("Activity by Blood Type")
         
-        donation_by_type = {bt: 0 for bt in Inventory.VALID_TYPES}
-        request_by_type = {bt: 0 for bt in Inventory.VALID_TYPES}
-        
-        for d in donors:
-            bt = d.get("blood_type")
-            if bt in donation_by_type:
-                donation_by_type[bt] += d.get("donated_amount", 0)
-        
-        for p in patients:
-            bt = p.get("blood_type")
-            if bt in request_by_type:
-                request_by_type[bt] += p.get("required_amount", 0)
-        
-        report_data = []
-        for bt in sorted(Inventory.VALID_TYPES):
-            report_data.append({
-                "Blood Type": bt,
-                "Donated (ml)": donation_by_type[bt],
-                "Requested (ml)": request_by_type[bt],
-                "Net (ml)": donation_by_type[bt] - request_by_type[bt]
-            })
+        st.dataframe(report_df, use_container_width=True)
         
-        import pandas as pd
-        st.dataframe(pd.DataFrame(report_data), use_container_width=True)
-        
-        db.log("Generated comprehensive reports.")
+        db.log("Generated comprehensive reports.", ts=now_iso)
     
     # ==================== Transaction History ====================
     elif page == "Transaction History":
@@ -466,25 +680,40 @@ def main():
         st.write(f"**Total {records_key.capitalize()}: {len(records)}**")
         
         if records:
-            import pandas as pd
-            st.dataframe(pd.DataFrame(records), use_container_width=True)
+            # db.cols is extended in place by inserts from other sessions
+            with db.lock:
+                history = history_df(db.rev, records_key, db.cols[records_key])
+            st.dataframe(history, use_container_width=True)
         else:
             st.info(f"No {records_key} records available.")
         
-        db.log(f"Viewed {records_key} transaction history.")
+        db.log(f"Viewed {records_key} transaction history.", ts=now_iso)
     
     # ==================== System Logs ====================
     elif page == "System Logs":
         st.header("📋 System Logs")
         
-        logs = db.data.get("logs", [])
+        logs = db.logs
         
         if logs:
             st.write(f"**Total Logs: {len(logs)}**")
-            for log in reversed(logs[-50:]):  # Show last 50 logs
-                st.write(log)
+            recent = logs[:-51:-1]  # last 50 logs, newest first
+            st.code("\n".join(recent), language="log")
         else:
             st.info("No logs available.")
+    
+    # ==================== Check Alerts ====================
+    alerts = []
+    for btype, amount in inventory.list_inventory().items():
+        if amount < CRITICAL_THRESHOLD:
+            alerts.append(f"⚠️ **{btype}** is critically low! Current: {amount} ml (Threshold: {CRITICAL_THRESHOLD} ml)")
+    
+    if alerts:
+        with alert_box:
+            st.warning("### 🚨 INVENTORY ALERTS")
+            for alert in alerts:
+                st.write(alert)
+            st.markdown("---")
 
 
 if __name__ == "__main__":